@@ -1,59 +1,130 @@
-from fastapi import Security, HTTPException, status, Request
-from fastapi.security.api_key import APIKeyHeader
-from typing import Optional
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+import functools
+import hashlib
+import hmac
 import os
 import logging
 import redis
+import redis.asyncio as aioredis
 
 logger = logging.getLogger(__name__)
 
 RATE_LIMIT = 60  # max requests per IP per 60-second window
 API_KEY_NAME = "X-API-Key"
 API_KEY_SECRET = os.getenv("API_KEY_SECRET", "api-key-secret")
+_API_KEY_BYTES = API_KEY_SECRET.encode("utf-8")
+# ASGI delivers header names lower-cased as raw bytes.
+_API_KEY_HEADER = API_KEY_NAME.lower().encode("latin-1")
 REDIS_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "64"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "0.05"))  # seconds
 
-# auto_error=False so we can raise 401 ourselves instead of Starlette's default 403
-api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
+# Paths reachable without an API key: the health check and the API docs.
+PUBLIC_PATHS = frozenset({"/", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"})
 
-# Single shared Redis connection — same instance used by Celery.
-redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+# Single bounded, process-wide pool — same Redis instance used by Celery.
+# Bytes mode: the limiter only reads integer replies, so nothing needs decoding.
+# The short socket timeout lets a stalled Redis hit the fail-open branch in
+# is_rate_limited instead of holding the request. When every connection is
+# busy, a check waits up to REDIS_POOL_TIMEOUT for one to free up; after that
+# the pool raises ConnectionError, which fails open like any Redis error.
+# Saturation is a property of the server, not of one client, so it must never
+# turn into a 429.
+redis_pool = aioredis.BlockingConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_POOL_SIZE,
+    timeout=REDIS_POOL_TIMEOUT,
+    socket_keepalive=True,
+    socket_timeout=0.2,
+    health_check_interval=30,
+)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
 
+# INCR + first-hit EXPIRE in one atomic round-trip. Returns the new count.
+RATE_LIMIT_WINDOW = 60  # seconds
+RATE_LIMIT_SCRIPT = (
+    "local c = redis.call('INCR', KEYS[1]) "
+    "if c == 1 then redis.call('EXPIRE', KEYS[1], ARGV[1]) end "
+    "return c"
+)
+# SHA1 is computed locally so importing this module never needs a live Redis.
+RATE_LIMIT_SHA = hashlib.sha1(RATE_LIMIT_SCRIPT.encode()).hexdigest()
 
-def get_api_key(api_key: Optional[str] = Security(api_key_header)) -> str:
-    """Validates the X-API-Key header. Returns 401 (not 403) on failure."""
-    if api_key == API_KEY_SECRET:
-        return api_key
-
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="API Key inválida o faltante",
-    )
+@functools.lru_cache(maxsize=8192)
+def _key_for(client_ip: str) -> bytes:
+    """Pre-encoded Redis key per client IP; IPs repeat heavily across requests."""
+    return f"rate_limit:{client_ip}".encode("ascii")
 
 
-def rate_limiter(request: Request) -> None:
+async def is_rate_limited(client_ip: str) -> bool:
     """Sliding-window rate limiter backed by Redis.
 
     Allows RATE_LIMIT requests per IP per 60-second window.
-    Uses a fallback key when request.client is None (e.g. ASGI test transport)
-    so the limiter always executes and mocks work correctly in tests.
     Degrades gracefully when Redis is unavailable (fail-open).
+    Async so the Redis round-trip runs on the event loop instead of tying up
+    a threadpool worker per request.
     """
-    client_ip = request.client.host if request.client else "testclient"
-    redis_key = f"rate_limit:{client_ip}"
+    redis_key = _key_for(client_ip)
 
     try:
-        count = redis_client.incr(redis_key)
-        # Set TTL only on the first request to start the window.
-        if count == 1:
-            redis_client.expire(redis_key, 60)
-
-        if count > RATE_LIMIT:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Try again later.",
-            )
-    except HTTPException:
-        raise
+        try:
+            count = await redis_client.evalsha(RATE_LIMIT_SHA, 1, redis_key, RATE_LIMIT_WINDOW)
+        except redis.exceptions.NoScriptError:
+            # Script not cached yet (or flushed) — EVAL runs it and caches it.
+            count = await redis_client.eval(RATE_LIMIT_SCRIPT, 1, redis_key, RATE_LIMIT_WINDOW)
     except redis.RedisError as exc:
-        # Redis is down — degrade gracefully rather than blocking all traffic.
-        logger.warning("Rate limiter unavailable (Redis error): %s", exc)
\ No newline at end of file
+        # Redis is down or the pool is exhausted — degrade gracefully rather
+        # than blocking all traffic.
+        logger.warning("Rate limiter unavailable (Redis error): %s", exc)
+        return False
+
+    return count > RATE_LIMIT
+
+
+class APIGuardMiddleware:
+    """Validates the X-API-Key header and applies the rate limit in one pass,
+    before any routing or dependency work.
+
+    Pure ASGI (no BaseHTTPMiddleware) so a request costs one header scan, a
+    constant-time comparison and a single Redis round-trip. The key is checked
+    first so unauthenticated requests never count against a client's limit.
+    Returns 401 (not 403) for a bad key and 429 over the limit, using
+    responses built once at import. Uses a fallback IP when the scope has no
+    client (e.g. ASGI test transport) so the limiter always executes.
+    """
+
+    _unauthorized = ORJSONResponse(
+        {"detail": "API Key inválida o faltante"},
+        status_code=status.HTTP_401_UNAUTHORIZED,
+    )
+    _too_many_requests = ORJSONResponse(
+        {"detail": "Rate limit exceeded. Try again later."},
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in PUBLIC_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == _API_KEY_HEADER:
+                authorized = hmac.compare_digest(value, _API_KEY_BYTES)
+                break
+        else:
+            authorized = False
+        if not authorized:
+            await self._unauthorized(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        if await is_rate_limited(client[0] if client else "testclient"):
+            await self._too_many_requests(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -1,22 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import Any, List, Optional, Tuple
 from datetime import datetime
+import base64
+import hashlib
+
+import orjson
 
 from app.api.schemas import (
-    DocumentCreate, DocumentResponse, PaginatedDocumentResponse,
+    DocumentCreate, DocumentBulkCreate, DocumentResponse, PaginatedDocumentResponse,
     BatchProcessRequest, JobResponse, BatchProcessResponse, DocumentUpdate
 )
 from app.application.use_cases import DocumentUseCase, BatchJobUseCase
-from app.domain.models import DocumentType, DocumentState
+from app.domain.models import BatchJob, Document, DocumentType, DocumentState
 from app.api.dependencies import get_document_use_case, get_batch_job_use_case
-from app.api.auth import get_api_key, rate_limiter
 
+# API-key validation and rate limiting run before routing, in
+# APIGuardMiddleware (see main.py), so the router has no shared dependencies.
 router = APIRouter(
-    dependencies=[Depends(get_api_key), Depends(rate_limiter)],
-    responses={401: {"description": "Invalid or missing API key"}},
+    default_response_class=ORJSONResponse,
+    responses={
+        401: {"description": "Invalid or missing API key"},
+        429: {"description": "Rate limit exceeded"},
+    },
 )
 
 
+# Single-resource GETs carry a weak ETag so polling clients can revalidate
+# with If-None-Match and get an empty 304 instead of the full body. no-cache
+# makes the browser revalidate on every request rather than answer a poll
+# from its own copy: a max-age would be stale time added on top of the
+# server-side read cache (and jobs, which the frontend polls, have none).
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _document_etag(doc: Document) -> str:
+    # There is no version column, so the tag hashes every mutable field.
+    digest = hashlib.blake2b(
+        orjson.dumps(
+            [doc.id, doc.invoice_type, doc.amount, doc.status, doc.metadata_doc],
+            option=orjson.OPT_SORT_KEYS,
+        ),
+        digest_size=8,
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _job_etag(job: BatchJob) -> str:
+    # completed_at and error_message only change together with the status.
+    return f'W/"{job.id}-{job.status.value}"'
+
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Sets the validators on ``response``; returns a 304 if the client's copy is current."""
+    validators = {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+    response.headers.update(validators)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=validators)
+    return None
+
+
+class _ListResponse(ORJSONResponse):
+    """ORJSONResponse that writes UTC datetimes with a ``Z`` suffix.
+
+    list_documents bypasses pydantic serialization, which renders UTC as
+    ``Z``; orjson's default ``+00:00`` would make the same document's
+    created_at differ between the listing and GET /documents/{id}.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+        )
+
+
+def _encode_cursor(created_at: datetime, doc_id: str) -> str:
+    """Opaque, URL-safe token for the keyset position after a row."""
+    return base64.urlsafe_b64encode(orjson.dumps([created_at, doc_id])).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, doc_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), str(doc_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.post(
     "/documents",
     response_model=DocumentResponse,
@@ -45,6 +118,36 @@ def create_document(
     return new_doc
 
 
+@router.post(
+    "/documents/bulk",
+    response_model=List[DocumentResponse],
+    status_code=201,
+    summary="Create several billing documents",
+    description=(
+        "Creates every document in `documents` in **DRAFT** status with a single multi-row insert. "
+        "Each item follows the same rules as `POST /documents`; if any item is invalid, none is created. "
+        "The created documents are returned in request order."
+    ),
+    responses={
+        201: {"description": "Documents created successfully"},
+        422: {"description": "Validation error — invalid payload"},
+    },
+    tags=["Documents"],
+)
+def create_documents(
+    bulk_in: DocumentBulkCreate,
+    use_case: DocumentUseCase = Depends(get_document_use_case),
+):
+    return use_case.create_documents([
+        {
+            "invoice_type": doc_in.invoice_type,
+            "amount": doc_in.amount,
+            "metadata_doc": doc_in.metadata_doc,
+        }
+        for doc_in in bulk_in.documents
+    ])
+
+
 @router.get(
     "/documents",
     response_model=PaginatedDocumentResponse,
@@ -52,10 +155,13 @@ def create_document(
     description=(
         "Returns a paginated list of billing documents. "
         "Results can be filtered by `invoice_type`, `status`, amount range, and creation date range. "
-        "Documents are returned in descending order by creation date."
+        "Documents are returned in descending order by creation date. "
+        "For deep pages, follow `next_cursor` via the `cursor` parameter instead of "
+        "increasing `skip`: the next page is then fetched with an index seek."
     ),
     responses={
         200: {"description": "Paginated list of documents"},
+        400: {"description": "Invalid cursor"},
         422: {"description": "Validation error — invalid query parameter"},
     },
     tags=["Documents"],
@@ -69,15 +175,37 @@ def list_documents(
     max_amount: Optional[float] = Query(None, description="Filter documents with amount <= this value"),
     start_date: Optional[datetime] = Query(None, description="Filter documents created on or after this datetime (ISO 8601)"),
     end_date: Optional[datetime] = Query(None, description="Filter documents created on or before this datetime (ISO 8601)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; skip is ignored when set"),
     use_case: DocumentUseCase = Depends(get_document_use_case),
 ):
+    after = _decode_cursor(cursor) if cursor is not None else None
     documents, total = use_case.search_documents(
-        skip=skip, limit=limit,
+        skip=skip, limit=limit, after=after,
         invoice_type=invoice_type, status=status,
         min_amount=min_amount, max_amount=max_amount,
         start_date=start_date, end_date=end_date,
     )
-    return {"items": documents, "total": total, "skip": skip, "limit": limit}
+    # Returning a response directly skips FastAPI's response_model validation
+    # and jsonable_encoder pass; the rows come from the DB already typed, so
+    # orjson encodes them as-is. response_model above still drives OpenAPI.
+    items = [
+        {
+            "id": doc.id,
+            "invoice_type": doc.invoice_type,
+            "amount": doc.amount,
+            "status": doc.status,
+            "created_at": doc.created_at,
+            "metadata": doc.metadata_doc,
+        }
+        for doc in documents
+    ]
+    next_cursor = None
+    if len(documents) == limit:
+        last = documents[-1]
+        next_cursor = _encode_cursor(last.created_at, last.id)
+    return _ListResponse({
+        "items": items, "total": total, "skip": skip, "limit": limit, "next_cursor": next_cursor,
+    })
 
 
 @router.get(
@@ -87,18 +215,21 @@ def list_documents(
     description="Returns the full details of a single billing document identified by its UUID.",
     responses={
         200: {"description": "Document found"},
+        304: {"description": "Not modified — the If-None-Match ETag is still current"},
         404: {"description": "Document not found"},
     },
     tags=["Documents"],
 )
 def get_document(
     doc_id: str,
+    request: Request,
+    response: Response,
     use_case: DocumentUseCase = Depends(get_document_use_case),
 ):
     doc = use_case.get_document(doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-    return doc
+    return _not_modified(request, response, _document_etag(doc)) or doc
 
 
 @router.patch(
@@ -147,7 +278,7 @@ def update_document(
     ),
     responses={
         202: {"description": "Batch job accepted and enqueued"},
-        400: {"description": "One or more document IDs were not found"},
+        400: {"description": "One or more document IDs were not found or are not in draft status"},
     },
     tags=["Batch"],
 )
@@ -174,15 +305,18 @@ def process_documents_batch(
     ),
     responses={
         200: {"description": "Job found"},
+        304: {"description": "Not modified — the If-None-Match ETag is still current"},
         404: {"description": "Job not found"},
     },
     tags=["Batch"],
 )
 def get_job_status(
     job_id: str,
+    request: Request,
+    response: Response,
     use_case: BatchJobUseCase = Depends(get_batch_job_use_case),
 ):
     job = use_case.get_job_status(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job
\ No newline at end of file
+    return _not_modified(request, response, _job_etag(job)) or job
\ No newline at end of file
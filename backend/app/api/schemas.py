@@ -1,8 +1,28 @@
-from pydantic import BaseModel, Field, ConfigDict, model_validator
-from typing import List, Dict, Any, Optional
+from pydantic import AfterValidator, BaseModel, Field, ConfigDict, field_validator, model_validator
+from typing import Annotated, List, Dict, Any, Optional
 from datetime import datetime
+import orjson
 from app.domain.models import DocumentState, DocumentType, JobStatus
 
+MAX_BATCH_SIZE = 1000  # upper bound on document IDs accepted per batch job
+MAX_METADATA_BYTES = 16_384  # upper bound on the JSON-encoded metadata object
+
+
+def cap_metadata_size(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Reject metadata whose compact JSON encoding exceeds MAX_METADATA_BYTES,
+    or that orjson cannot encode at all (integers beyond 64 bits)."""
+    try:
+        encoded = orjson.dumps(metadata)
+    except orjson.JSONEncodeError as exc:
+        # A TypeError would escape pydantic as a 500; ValueError becomes a 422.
+        raise ValueError(f"metadata is not encodable as JSON: {exc}") from exc
+    if len(encoded) > MAX_METADATA_BYTES:
+        raise ValueError(f"metadata must encode to at most {MAX_METADATA_BYTES} bytes of JSON")
+    return metadata
+
+
+MetadataDict = Annotated[Dict[str, Any], AfterValidator(cap_metadata_size)]
+
 
 class DocumentCreate(BaseModel):
     """Payload to create a new billing document."""
@@ -18,14 +38,24 @@ class DocumentCreate(BaseModel):
         description="Document amount — must be greater than zero",
         examples=[1500.50],
     )
-    metadata_doc: Dict[str, Any] = Field(
+    metadata_doc: MetadataDict = Field(
         default_factory=dict,
         alias="metadata",
-        description="Optional free-form metadata to attach to the document",
+        description=f"Optional free-form metadata to attach to the document (max {MAX_METADATA_BYTES} bytes as JSON)",
         examples=[{"client": "Acme Corp", "reference": "REF-001"}],
     )
 
 
+class DocumentBulkCreate(BaseModel):
+    """Payload to create several billing documents in one request."""
+
+    documents: List[DocumentCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description=f"Documents to create (1 to {MAX_BATCH_SIZE}), all in DRAFT status",
+    )
+
 
 class DocumentUpdate(BaseModel):
     """Payload for partially updating a billing document.
@@ -48,10 +78,10 @@ class DocumentUpdate(BaseModel):
         description="New amount — must be greater than zero if provided",
         examples=[2000.00],
     )
-    metadata_doc: Optional[Dict[str, Any]] = Field(
+    metadata_doc: Optional[MetadataDict] = Field(
         default=None,
         alias="metadata",
-        description="New metadata object (replaces current metadata entirely)",
+        description=f"New metadata object (replaces current metadata entirely, max {MAX_METADATA_BYTES} bytes as JSON)",
         examples=[{"client": "Beta LLC", "reference": "REF-002"}],
     )
 
@@ -87,6 +117,10 @@ class PaginatedDocumentResponse(BaseModel):
     total: int = Field(description="Total number of documents matching the applied filters")
     skip: int = Field(description="Number of records skipped (offset)")
     limit: int = Field(description="Maximum number of records returned per page")
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Pass as `cursor` to fetch the next page; null when this page is the last one",
+    )
 
 
 class BatchProcessRequest(BaseModel):
@@ -94,10 +128,21 @@ class BatchProcessRequest(BaseModel):
 
     document_ids: List[str] = Field(
         ...,
-        description="List of document IDs to process",
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description=(
+            f"List of document IDs to process (1 to {MAX_BATCH_SIZE}). "
+            "Repeated IDs are collapsed, keeping the first occurrence."
+        ),
         examples=[["uuid-1", "uuid-2"]],
     )
 
+    @field_validator("document_ids")
+    @classmethod
+    def deduplicate_ids(cls, ids: List[str]) -> List[str]:
+        """Drop repeated IDs while preserving submission order."""
+        return list(dict.fromkeys(ids))
+
 
 class BatchProcessResponse(BaseModel):
     """Response returned when a batch job is successfully accepted."""
@@ -1,10 +1,77 @@
 from typing import List, Optional, Tuple, Dict, Any
+from datetime import datetime
+import threading
 
-from app.domain.models import Document, DocumentType, BatchJob
+import orjson
+from cachetools import TTLCache
+
+from app.domain.models import Document, DocumentRow, DocumentType, BatchJob
 from app.infrastructure.repository import DocumentRepository, JobRepository
 from app.infrastructure.tasks import process_documents_task
 
+# Short-lived per-process cache for GET /documents/{id}. The TTL bounds how
+# stale a read can be when another process (e.g. the Celery worker) changes
+# a document; writes made through this process invalidate their entry.
+DOCUMENT_CACHE_TTL = 2  # seconds
+_doc_cache: TTLCache = TTLCache(maxsize=10_000, ttl=DOCUMENT_CACHE_TTL)
+_cache_lock = threading.RLock()
+
+# Negative cache for lookups that found nothing, keyed by ("document" | "job", id),
+# so repeated 404s (e.g. scanners probing random IDs) skip the SELECT.
+MISS_CACHE_TTL = 30  # seconds
+_miss_cache: TTLCache = TTLCache(maxsize=10_000, ttl=MISS_CACHE_TTL)
+
+
+# Totals for GET /documents keyed by the filter combination, so paging
+# through the same result set runs the COUNT query once. Any document write
+# in this process clears it. The Celery worker only ever changes status, and
+# cannot reach this cache, so totals filtered by status are never cached.
+COUNT_CACHE_TTL = 10  # seconds
+_count_cache: TTLCache = TTLCache(maxsize=256, ttl=COUNT_CACHE_TTL)
+
+
+def _check_metadata(metadata_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Rejects metadata the orjson-backed JSON column cannot store exactly
+    (integers beyond 64 bits), as the API's DocumentCreate validation does."""
+    try:
+        orjson.dumps(metadata_doc)
+    except orjson.JSONEncodeError as exc:
+        raise ValueError(f"metadata is not encodable as JSON: {exc}") from exc
+    return metadata_doc
+
+
+def invalidate_cached_documents(*doc_ids: str) -> None:
+    with _cache_lock:
+        for doc_id in doc_ids:
+            _doc_cache.pop(doc_id, None)
+        _count_cache.clear()
+
+
+def _is_known_miss(kind: str, entity_id: str) -> bool:
+    with _cache_lock:
+        return (kind, entity_id) in _miss_cache
+
+
+def _remember_miss(kind: str, entity_id: str) -> None:
+    with _cache_lock:
+        _miss_cache[(kind, entity_id)] = True
+
+
+def _forget_miss(kind: str, entity_id: str) -> None:
+    with _cache_lock:
+        _miss_cache.pop((kind, entity_id), None)
+
+
+def clear_read_caches() -> None:
+    with _cache_lock:
+        _doc_cache.clear()
+        _miss_cache.clear()
+        _count_cache.clear()
+
+
 class DocumentUseCase:
+    __slots__ = ("repo",)
+
     def __init__(self, repository: DocumentRepository):
         self.repo = repository
 
@@ -12,12 +79,47 @@ class DocumentUseCase:
         new_doc = Document(
             invoice_type=invoice_type, 
             amount=amount, 
-            metadata_doc=metadata_doc or {}
+            metadata_doc=_check_metadata(metadata_doc or {})
         )
-        return self.repo.save(new_doc)
+        saved = self.repo.save(new_doc)
+        _forget_miss("document", saved.id)
+        invalidate_cached_documents()
+        return saved
+
+    def create_documents(self, documents: List[Dict[str, Any]]) -> List[Document]:
+        """Creates several DRAFT documents in one round trip.
+
+        Each item holds the create_document keyword arguments.
+        """
+        new_docs = [
+            Document(
+                invoice_type=item["invoice_type"],
+                amount=item["amount"],
+                metadata_doc=_check_metadata(item.get("metadata_doc") or {}),
+            )
+            for item in documents
+        ]
+        saved = self.repo.bulk_create(new_docs)
+        for doc in saved:
+            _forget_miss("document", doc.id)
+        invalidate_cached_documents()
+        return saved
 
     def get_document(self, doc_id: str) -> Optional[Document]:
-        return self.repo.get_by_id(doc_id)
+        with _cache_lock:
+            doc = _doc_cache.get(doc_id)
+        if doc is not None:
+            return doc
+        if _is_known_miss("document", doc_id):
+            return None
+
+        doc = self.repo.get_by_id(doc_id)
+        if doc is None:
+            _remember_miss("document", doc_id)
+            return None
+        with _cache_lock:
+            _doc_cache[doc_id] = doc
+        return doc
 
     def update_document(
         self,
@@ -35,40 +137,69 @@ class DocumentUseCase:
         if amount is not None:
             doc.amount = amount
         if metadata_doc is not None:
-            doc.metadata_doc = metadata_doc
+            doc.metadata_doc = _check_metadata(metadata_doc)
 
-        return self.repo.save(doc)
+        saved = self.repo.save(doc)
+        invalidate_cached_documents(doc_id)
+        return saved
 
     def search_documents(
-        self, skip: int, limit: int, **filters
-    ) -> Tuple[List[Document], int]:
-        return self.repo.search(skip=skip, limit=limit, **filters)
+        self, skip: int, limit: int, after: Optional[Tuple[datetime, str]] = None, **filters
+    ) -> Tuple[List[DocumentRow], int]:
+        cacheable = filters.get("status") is None
+        count_key = tuple(sorted(filters.items()))
+        total = None
+        if cacheable:
+            with _cache_lock:
+                total = _count_cache.get(count_key)
+
+        documents, counted = self.repo.search(
+            skip=skip, limit=limit, with_total=total is None, after=after, **filters
+        )
+        if total is None:
+            total = counted
+            if cacheable:
+                with _cache_lock:
+                    _count_cache[count_key] = total
+        return documents, total
 
 class BatchJobUseCase:
+    __slots__ = ("job_repo", "doc_repo")
+
     def __init__(self, job_repo: JobRepository, doc_repo: DocumentRepository):
         self.job_repo = job_repo
         self.doc_repo = doc_repo
 
     def create_batch_process(self, document_ids: List[str]) -> BatchJob:
-        docs_to_process = []
-    
-        for doc_id in document_ids:
-            doc = self.doc_repo.get_by_id(doc_id)
+        docs_by_id = {doc.id: doc for doc in self.doc_repo.get_by_ids(document_ids)}
+
+        # dict.fromkeys keeps the request order while skipping repeated IDs.
+        for doc_id in dict.fromkeys(document_ids):
+            doc = docs_by_id.get(doc_id)
             if not doc:
                 raise ValueError(f"Document with ID {doc_id} not found.")
 
+            # Validates the transition; the repository applies it set-wise.
             doc.submit_for_review()
-            docs_to_process.append(doc)
 
-        for doc in docs_to_process:
-            self.doc_repo.save(doc)
+        moved = self.doc_repo.mark_pending(list(docs_by_id))
+        invalidate_cached_documents(*docs_by_id)
+        if moved < len(docs_by_id):
+            # Another batch claimed some of them since get_by_ids read them.
+            raise ValueError("One or more documents are no longer in draft status.")
 
         new_job = BatchJob(document_ids=document_ids)
         saved_job = self.job_repo.save(new_job)
+        _forget_miss("job", saved_job.id)
 
         process_documents_task.delay(saved_job.id)
 
         return saved_job
 
     def get_job_status(self, job_id: str) -> Optional[BatchJob]:
-        return self.job_repo.get_by_id(job_id)
\ No newline at end of file
+        if _is_known_miss("job", job_id):
+            return None
+        job = self.job_repo.get_by_id(job_id)
+        if job is None:
+            _remember_miss("job", job_id)
+        return job
\ No newline at end of file
@@ -0,0 +1,40 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# Coarsened UTC clock: calls within the same millisecond share one aware
+# datetime instead of each building a new one. time.monotonic() is a vDSO
+# read, so the check is much cheaper than datetime.now(timezone.utc).
+_RESOLUTION = 0.001  # seconds
+_cached_ts: float = float("-inf")
+_cached_dt: datetime = datetime.now(timezone.utc)
+
+
+def now_utc() -> datetime:
+    """Returns the current UTC time with ~1 ms granularity."""
+    global _cached_ts, _cached_dt
+    t = time.monotonic()
+    if t - _cached_ts > _RESOLUTION:
+        _cached_dt = datetime.now(timezone.utc)
+        _cached_ts = t
+    return _cached_dt
+
+
+# Creation timestamps order GET /documents, with the random UUID only as a
+# tiebreaker, so they need full precision and must never repeat: two rows
+# created in the same microsecond (or behind a coarse OS clock) would
+# otherwise list in arbitrary order.
+_ONE_MICROSECOND = timedelta(microseconds=1)
+_last_created: datetime = datetime.min.replace(tzinfo=timezone.utc)
+_created_lock = threading.Lock()
+
+
+def creation_time_utc() -> datetime:
+    """Returns the current UTC time, strictly later than any earlier call in this process."""
+    global _last_created
+    now = datetime.now(timezone.utc)
+    with _created_lock:
+        if now <= _last_created:
+            now = _last_created + _ONE_MICROSECOND
+        _last_created = now
+    return now
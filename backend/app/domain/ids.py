@@ -0,0 +1,32 @@
+import os
+import threading
+
+# Random bytes are read from the OS CSPRNG in 4 KiB chunks (256 IDs per
+# syscall) instead of one os.urandom(16) call per uuid.uuid4().
+_POOL_SIZE = 4096
+_local = threading.local()
+
+
+def _reset_after_fork() -> None:
+    # A forked worker must not reuse the parent's unread bytes, or both
+    # processes would hand out the same IDs.
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def fast_uuid4_str() -> str:
+    """Returns a random RFC 4122 version-4 UUID in canonical 36-char form."""
+    offset = getattr(_local, "offset", _POOL_SIZE)
+    if offset >= _POOL_SIZE:
+        _local.pool = os.urandom(_POOL_SIZE)
+        offset = 0
+    _local.offset = offset + 16
+
+    b = bytearray(_local.pool[offset:offset + 16])
+    b[6] = (b[6] & 0x0F) | 0x40  # version 4
+    b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
\ No newline at end of file
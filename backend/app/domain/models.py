@@ -1,8 +1,10 @@
+from dataclasses import dataclass
 from enum import Enum
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
-import uuid
+from app.domain.clock import creation_time_utc, now_utc
+from app.domain.ids import fast_uuid4_str
 
 class DocumentState(str, Enum):
     DRAFT = "draft"
@@ -19,11 +21,11 @@ class InvalidStateTransitionError(ValueError):
     pass
 
 class Document(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=fast_uuid4_str)
     invoice_type: DocumentType
     amount: float = Field(gt=0, description="The amount must be greater than zero.")
     status: DocumentState = Field(default=DocumentState.DRAFT)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=creation_time_utc)
     metadata_doc: Dict[str, Any] = Field(default_factory=dict)
 
     def submit_for_review(self) -> None:
@@ -45,6 +47,21 @@ class Document(BaseModel):
         self.status = DocumentState.REJECTED
 
 
+@dataclass(slots=True)
+class DocumentRow:
+    """Lightweight read-only view of a Document for listing queries.
+
+    Carries the same fields without pydantic's per-instance bookkeeping;
+    use Document whenever the state machine or validation is needed.
+    """
+    id: str
+    invoice_type: DocumentType
+    amount: float
+    status: DocumentState
+    created_at: datetime
+    metadata_doc: Dict[str, Any]
+
+
 class JobStatus(str, Enum):
     PENDING = "pending"  
     PROCESSING = "processing"
@@ -52,10 +69,10 @@ class JobStatus(str, Enum):
     FAILED = "failed"
 
 class BatchJob(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=fast_uuid4_str)
     document_ids: List[str] = Field(description="Document ID list to process")
     status: JobStatus = Field(default=JobStatus.PENDING)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=now_utc)
     completed_at: Optional[datetime] = Field(default=None)
     error_message: Optional[str] = Field(default=None)
     
@@ -64,9 +81,9 @@ class BatchJob(BaseModel):
 
     def mark_as_completed(self) -> None:
         self.status = JobStatus.COMPLETED
-        self.completed_at = datetime.now(timezone.utc)
+        self.completed_at = now_utc()
         
     def mark_as_failed(self, error: str) -> None:
         self.status = JobStatus.FAILED
-        self.completed_at = datetime.now(timezone.utc)
+        self.completed_at = now_utc()
         self.error_message = error
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
@@ -6,7 +7,38 @@ from dotenv import load_dotenv
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://billing_user:billing_password@db:5432/billing_db")
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+
+def _orjson_dumps(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+# JSON columns (documents.metadata_doc, batch_jobs.document_ids off PostgreSQL)
+# are encoded/decoded with orjson instead of the stdlib json module. Passed to
+# every engine so the test engine behaves like the real one.
+JSON_ENGINE_OPTIONS = {
+    "json_serializer": _orjson_dumps,
+    "json_deserializer": orjson.loads,
+}
+
+# Sync endpoints run on Starlette's threadpool (40 threads), so the default
+# QueuePool (5 + 10 overflow) makes requests queue for a connection under
+# load. pool_pre_ping replaces connections dropped by a database restart
+# instead of failing the request that checks them out.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    POOL_OPTIONS = {}
+else:
+    POOL_OPTIONS = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **JSON_ENGINE_OPTIONS, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, Float, DateTime, JSON, Enum as SQLEnum, ARRAY
+from sqlalchemy import Column, String, Float, DateTime, JSON, Enum as SQLEnum, ARRAY, Index
 from sqlalchemy.types import TypeDecorator
 from app.infrastructure.database import Base
 from app.domain.models import DocumentState, DocumentType, JobStatus
-import datetime
+from app.domain.clock import creation_time_utc, now_utc
 
 
 class StringList(TypeDecorator):
@@ -25,22 +25,52 @@ class StringList(TypeDecorator):
     def process_result_value(self, value, dialect):
         return value if value is not None else []
 
+def string_enum(enum_cls, name: str) -> SQLEnum:
+    """Stores a str-based enum as VARCHAR + CHECK on its values.
+
+    Avoids a native PostgreSQL ENUM type (and the casts it adds to every
+    filter) while still returning enum members on read.
+    """
+    return SQLEnum(
+        enum_cls,
+        name=name,
+        native_enum=False,
+        create_constraint=True,
+        values_callable=lambda members: [member.value for member in members],
+        validate_strings=True,
+    )
+
+
 class DocumentDB(Base):
     __tablename__ = "documents"
 
     id = Column(String, primary_key=True, index=True)
-    invoice_type = Column(SQLEnum(DocumentType), nullable=False, index=True)
+    invoice_type = Column(string_enum(DocumentType, "ck_documents_invoice_type"), nullable=False)
     amount = Column(Float, nullable=False)
-    status = Column(SQLEnum(DocumentState), default=DocumentState.DRAFT, nullable=False, index=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.datetime.now(datetime.timezone.utc))
+    status = Column(string_enum(DocumentState, "ck_documents_status"), default=DocumentState.DRAFT, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=creation_time_utc)
     metadata_doc = Column(JSON, default=dict)
 
+
+# DocumentRepository.search always orders by (created_at DESC, id DESC),
+# optionally after an equality filter on status or invoice_type, so those
+# columns are indexed in that order (a page becomes an index range scan, no
+# sort, and a keyset page seeks straight to its first row). The composite
+# indexes also replace the former single-column status/invoice_type indexes.
+Index("ix_documents_created_at", DocumentDB.created_at.desc(), DocumentDB.id.desc())
+Index("ix_documents_status_created_at", DocumentDB.status, DocumentDB.created_at.desc(), DocumentDB.id.desc())
+Index(
+    "ix_documents_invoice_type_created_at",
+    DocumentDB.invoice_type, DocumentDB.created_at.desc(), DocumentDB.id.desc(),
+)
+Index("ix_documents_amount", DocumentDB.amount)
+
 class BatchJobDB(Base):
     __tablename__ = "batch_jobs"
 
     id = Column(String, primary_key=True, index=True)
     document_ids = Column(StringList, nullable=False)
-    status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING, nullable=False, index=True)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.datetime.now(datetime.timezone.utc))
+    status = Column(string_enum(JobStatus, "ck_batch_jobs_status"), default=JobStatus.PENDING, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=now_utc)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(String, nullable=True)
@@ -1,50 +1,274 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional, Tuple
+from sqlalchemy import Float, Row, Select, bindparam, case, desc, func, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from app.domain.models import Document, BatchJob, DocumentState, DocumentType
+from app.domain.models import Document, DocumentRow, BatchJob, DocumentState, DocumentType, JobStatus
+from app.domain.clock import now_utc
 from app.infrastructure.models import DocumentDB, BatchJobDB
 
+# Hot reads select plain columns through Core: rows come back as lightweight
+# Row tuples (attribute access by column name) with no identity-map or
+# instrumentation overhead.
+_DOCUMENT_COLUMNS = (
+    DocumentDB.id,
+    DocumentDB.invoice_type,
+    DocumentDB.amount,
+    DocumentDB.status,
+    DocumentDB.created_at,
+    DocumentDB.metadata_doc,
+)
+_JOB_COLUMNS = (
+    BatchJobDB.id,
+    BatchJobDB.document_ids,
+    BatchJobDB.status,
+    BatchJobDB.created_at,
+    BatchJobDB.completed_at,
+    BatchJobDB.error_message,
+)
+
+# search() filters, built once: each optional filter is a predicate against a
+# named bind parameter, so a request only selects which predicates apply and
+# passes the values at execute time instead of rebuilding clauses per call.
+_SEARCH_PREDICATES = {
+    "invoice_type": DocumentDB.invoice_type == bindparam("invoice_type"),
+    "status": DocumentDB.status == bindparam("status"),
+    "min_amount": DocumentDB.amount >= bindparam("min_amount"),
+    "max_amount": DocumentDB.amount <= bindparam("max_amount"),
+    "start_date": DocumentDB.created_at >= bindparam("start_date"),
+    "end_date": DocumentDB.created_at <= bindparam("end_date"),
+}
+
+# Hot-path statements are built once and executed with parameters, so each
+# call skips statement construction and hits SQLAlchemy's compiled cache
+# directly.
+_DOCUMENT_BY_ID = select(*_DOCUMENT_COLUMNS).where(DocumentDB.id == bindparam("id"))
+_DOCUMENTS_BY_IDS = select(*_DOCUMENT_COLUMNS).where(
+    DocumentDB.id.in_(bindparam("ids", expanding=True))
+)
+_JOB_BY_ID = select(*_JOB_COLUMNS).where(BatchJobDB.id == bindparam("id"))
+
+# Guarded state transitions. Bind names must not clash with the columns an
+# UPDATE sets, hence doc_ids / job_id. _FINISH_JOB has no fixed SET clause:
+# the columns come from the parameters passed at execute time.
+_MARK_DOCUMENTS_PENDING = (
+    update(DocumentDB)
+    .where(
+        DocumentDB.id.in_(bindparam("doc_ids", expanding=True)),
+        DocumentDB.status == DocumentState.DRAFT,
+    )
+    .values(status=DocumentState.PENDING)
+)
+_MARK_JOB_PROCESSING = (
+    update(BatchJobDB)
+    .where(BatchJobDB.id == bindparam("job_id"), BatchJobDB.status == JobStatus.PENDING)
+    .values(status=JobStatus.PROCESSING)
+    .returning(BatchJobDB.document_ids)
+)
+_FINISH_JOB = update(BatchJobDB).where(
+    BatchJobDB.id == bindparam("job_id"), BatchJobDB.status == JobStatus.PROCESSING
+)
+
+# Keyset ("seek") pagination: the next page starts strictly after the last
+# row seen in (created_at DESC, id DESC) order, so the database seeks into the
+# index instead of scanning and discarding OFFSET rows.
+_AFTER_PREDICATE = tuple_(DocumentDB.created_at, DocumentDB.id) < tuple_(
+    bindparam("after_created_at", type_=DocumentDB.created_at.type),
+    bindparam("after_id", type_=DocumentDB.id.type),
+)
+
+# Statements per combination of active search filters: count, offset page,
+# offset page with a COUNT(*) OVER () column, keyset page. Filter names always
+# arrive in _SEARCH_PREDICATES order, so there are at most 64 keys.
+_search_statements: Dict[Tuple[str, ...], Tuple[Select, Select, Select, Select]] = {}
+
+
+def _search_statements_for(filter_names: Tuple[str, ...]) -> Tuple[Select, Select, Select, Select]:
+    statements = _search_statements.get(filter_names)
+    if statements is None:
+        conditions = [_SEARCH_PREDICATES[name] for name in filter_names]
+        count_stmt = select(func.count()).select_from(DocumentDB).where(*conditions)
+        # id breaks created_at ties so both modes walk one total order.
+        order = (desc(DocumentDB.created_at), desc(DocumentDB.id))
+        ordered = select(*_DOCUMENT_COLUMNS).where(*conditions).order_by(*order)
+        offset_stmt = ordered.offset(bindparam("skip")).limit(bindparam("limit"))
+        # The window is evaluated over the filtered set before OFFSET/LIMIT,
+        # so every returned row carries the full match count.
+        counted_offset_stmt = (
+            select(*_DOCUMENT_COLUMNS, func.count().over())
+            .where(*conditions)
+            .order_by(*order)
+            .offset(bindparam("skip"))
+            .limit(bindparam("limit"))
+        )
+        keyset_stmt = ordered.where(_AFTER_PREDICATE).limit(bindparam("limit"))
+        statements = _search_statements[filter_names] = (
+            count_stmt, offset_stmt, counted_offset_stmt, keyset_stmt,
+        )
+    return statements
+
+
+# Both dialects expose the same INSERT ... ON CONFLICT API (same PostgreSQL /
+# SQLite split as StringList in models.py).
+_DIALECT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+# A uniform draw in [0, 1) computed by the database. PostgreSQL's random()
+# already is one; SQLite's returns a signed 64-bit integer, so it is rescaled.
+_DIALECT_RANDOM = {
+    "postgresql": lambda: func.random(),
+    "sqlite": lambda: func.random() / 18446744073709551616.0 + 0.5,
+}
+
+# resolve_pending's UPDATE per dialect, built on first use.
+_resolve_pending_statements: Dict[str, Any] = {}
+
+
+def _resolve_pending_statement(dialect_name: str):
+    stmt = _resolve_pending_statements.get(dialect_name)
+    if stmt is None:
+        draw = _DIALECT_RANDOM[dialect_name]()
+        stmt = _resolve_pending_statements[dialect_name] = (
+            update(DocumentDB)
+            .where(
+                DocumentDB.id.in_(bindparam("doc_ids", expanding=True)),
+                DocumentDB.status == DocumentState.PENDING,
+            )
+            .values(
+                status=case(
+                    (draw < bindparam("approval_rate", type_=Float), DocumentState.APPROVED.value),
+                    else_=DocumentState.REJECTED.value,
+                )
+            )
+        )
+    return stmt
+
+
+def _upsert(db: Session, table, values: dict, update_columns: Tuple[str, ...]) -> None:
+    """Inserts ``values`` or, if the id already exists, updates ``update_columns``
+    in a single statement (no SELECT first)."""
+    dialect_insert = _DIALECT_INSERTS[db.get_bind().dialect.name]
+    stmt = dialect_insert(table).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.id],
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+    db.execute(stmt)
+
+
+def _to_document(db_doc: Row) -> Document:
+    # Rows are already typed by the SQLAlchemy schema, so validation is
+    # skipped on this trusted path; untrusted input is validated at the API.
+    return Document.model_construct(
+        id=db_doc.id,
+        invoice_type=db_doc.invoice_type,
+        amount=db_doc.amount,
+        status=db_doc.status,
+        created_at=db_doc.created_at,
+        metadata_doc=db_doc.metadata_doc,
+    )
+
+
+def _to_batch_job(db_job: Row) -> BatchJob:
+    return BatchJob.model_construct(
+        id=db_job.id,
+        document_ids=db_job.document_ids,
+        status=db_job.status,
+        created_at=db_job.created_at,
+        completed_at=db_job.completed_at,
+        error_message=db_job.error_message,
+    )
+
+
 class DocumentRepository:
+    # Only holds the request's Session; slots keep the per-request object small.
+    __slots__ = ("db",)
+
     def __init__(self, db: Session):
         self.db = db
 
     def save(self, document: Document) -> Document:
-        db_doc = self.db.query(DocumentDB).filter(DocumentDB.id == document.id).first()
-        
-        if not db_doc:
-            db_doc = DocumentDB(
-                id=document.id,
-                invoice_type=document.invoice_type,
-                amount=document.amount,
-                status=document.status,
-                created_at=document.created_at,
-                metadata_doc=document.metadata_doc
-            )
-            self.db.add(db_doc)
-        else:
-            db_doc.invoice_type = document.invoice_type
-            db_doc.amount = document.amount
-            db_doc.status = document.status
-            db_doc.metadata_doc = document.metadata_doc
-            
+        _upsert(
+            self.db,
+            DocumentDB,
+            {
+                "id": document.id,
+                "invoice_type": document.invoice_type,
+                "amount": document.amount,
+                "status": document.status,
+                "created_at": document.created_at,
+                "metadata_doc": document.metadata_doc,
+            },
+            update_columns=("invoice_type", "amount", "status", "metadata_doc"),
+        )
         self.db.commit()
         return document
 
+    def bulk_create(self, documents: List[Document]) -> List[Document]:
+        """Inserts new documents with one executemany INSERT and one commit."""
+        if not documents:
+            return []
+        rows = [
+            {
+                "id": doc.id,
+                "invoice_type": doc.invoice_type,
+                "amount": doc.amount,
+                "status": doc.status,
+                "created_at": doc.created_at,
+                "metadata_doc": doc.metadata_doc,
+            }
+            for doc in documents
+        ]
+        self.db.execute(insert(DocumentDB), rows)
+        self.db.commit()
+        return documents
+
     def get_by_id(self, doc_id: str) -> Optional[Document]:
-        db_doc = self.db.query(DocumentDB).filter(DocumentDB.id == doc_id).first()
+        db_doc = self.db.execute(_DOCUMENT_BY_ID, {"id": doc_id}).one_or_none()
         if not db_doc:
             return None
             
-        return Document(
-            id=db_doc.id,
-            invoice_type=db_doc.invoice_type,
-            amount=db_doc.amount,
-            status=db_doc.status,
-            created_at=db_doc.created_at,
-            metadata_doc=db_doc.metadata_doc
-        )
+        return _to_document(db_doc)
+
+    def get_by_ids(self, doc_ids: List[str]) -> List[Document]:
+        """Fetches every existing document in ``doc_ids`` with a single SELECT ... IN."""
+        if not doc_ids:
+            return []
+        db_docs = self.db.execute(_DOCUMENTS_BY_IDS, {"ids": doc_ids}).all()
+        return [_to_document(doc) for doc in db_docs]
+
+    def mark_pending(self, doc_ids: List[str]) -> int:
+        """Moves the DRAFT documents in ``doc_ids`` to PENDING with a single
+        UPDATE and returns how many rows it moved.
+
+        The ``status == DRAFT`` guard leaves any other document untouched. The
+        move is all or nothing: if a concurrent batch already claimed one of
+        the documents, the UPDATE is rolled back so none is left PENDING
+        without a job to resolve it.
+        """
+        if not doc_ids:
+            return 0
+        moved = self.db.execute(_MARK_DOCUMENTS_PENDING, {"doc_ids": doc_ids}).rowcount
+        if moved == len(doc_ids):
+            self.db.commit()
+        else:
+            self.db.rollback()
+        return moved
+
+    def resolve_pending(self, doc_ids: List[str], approval_rate: float) -> None:
+        """Approves each PENDING document in ``doc_ids`` with probability
+        ``approval_rate`` and rejects the rest, in a single UPDATE.
+
+        The draw happens in the database, so no per-document work is done in
+        Python; the ``status == PENDING`` guard enforces the state machine in
+        SQL and leaves any other document untouched.
+        """
+        if not doc_ids:
+            return
+        stmt = _resolve_pending_statement(self.db.get_bind().dialect.name)
+        self.db.execute(stmt, {"doc_ids": doc_ids, "approval_rate": approval_rate})
+        self.db.commit()
 
     def search(
         self, 
@@ -55,72 +279,111 @@ class DocumentRepository:
         min_amount: Optional[float] = None,
         max_amount: Optional[float] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> Tuple[List[Document], int]:
-        query = self.db.query(DocumentDB)
-
-        if invoice_type:
-            query = query.filter(DocumentDB.invoice_type == invoice_type)
-        if status:
-            query = query.filter(DocumentDB.status == status)
-        if min_amount is not None:
-            query = query.filter(DocumentDB.amount >= min_amount)
-        if max_amount is not None:
-            query = query.filter(DocumentDB.amount <= max_amount)
-        if start_date:
-            query = query.filter(DocumentDB.created_at >= start_date)
-        if end_date:
-            query = query.filter(DocumentDB.created_at <= end_date)
-
-        total = query.count()
-        
-        db_docs = query.order_by(desc(DocumentDB.created_at)).offset(skip).limit(limit).all()
-    
-        documents = [
-            Document(
-                id=doc.id, 
-                invoice_type=doc.invoice_type, 
-                amount=doc.amount, 
-                status=doc.status, 
-                created_at=doc.created_at, 
-                metadata_doc=doc.metadata_doc
-            ) for doc in db_docs
-        ]
-        
+        end_date: Optional[datetime] = None,
+        with_total: bool = True,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> Tuple[List[DocumentRow], Optional[int]]:
+        """Returns one page of matching documents and the total match count.
+
+        Offset pages fetch the total in the same query as the rows. Pass
+        ``with_total=False`` to skip counting (total is then None) when the
+        caller already knows the total. Pass ``after`` as the
+        ``(created_at, id)`` of the last row of the previous page to seek to
+        the next page instead of offsetting by ``skip`` (which is then ignored).
+        """
+        filters = {
+            name: value
+            for name, value in (
+                ("invoice_type", invoice_type),
+                ("status", status),
+                ("min_amount", min_amount),
+                ("max_amount", max_amount),
+                ("start_date", start_date),
+                ("end_date", end_date),
+            )
+            if value is not None
+        }
+        count_stmt, offset_stmt, counted_offset_stmt, keyset_stmt = _search_statements_for(tuple(filters))
+
+        # Rows are column tuples in _DOCUMENT_COLUMNS order, matching DocumentRow.
+        # They are consumed straight from the cursor, without an intermediate
+        # list of Row objects.
+        if after is not None:
+            after_created_at, after_id = after
+            result = self.db.execute(
+                keyset_stmt,
+                {**filters, "after_created_at": after_created_at, "after_id": after_id, "limit": limit},
+            )
+            documents = [DocumentRow(*row) for row in result]
+        elif with_total:
+            # Offset page and total in one round-trip via COUNT(*) OVER ().
+            result = self.db.execute(counted_offset_stmt, {**filters, "skip": skip, "limit": limit})
+            rows = result.all()
+            documents = [DocumentRow(*row[:-1]) for row in rows]
+            if rows:
+                return documents, rows[0][-1]
+            if skip == 0:
+                return documents, 0
+        else:
+            result = self.db.execute(offset_stmt, {**filters, "skip": skip, "limit": limit})
+            documents = [DocumentRow(*row) for row in result]
+
+        # Keyset pages and offsets past the last match have no rows to carry
+        # the window count, so the total needs its own COUNT.
+        total = None
+        if with_total:
+            total = self.db.execute(count_stmt, filters).scalar_one()
+
         return documents, total
 
 class JobRepository:
+    __slots__ = ("db",)
+
     def __init__(self, db: Session):
         self.db = db
 
     def save(self, job: BatchJob) -> BatchJob:
-        db_job = self.db.query(BatchJobDB).filter(BatchJobDB.id == job.id).first()
-        if not db_job:
-            db_job = BatchJobDB(
-                id=job.id, 
-                document_ids=job.document_ids, 
-                status=job.status,
-                created_at=job.created_at, 
-                completed_at=job.completed_at, 
-                error_message=job.error_message
-            )
-            self.db.add(db_job)
-        else:
-            db_job.status = job.status
-            db_job.completed_at = job.completed_at
-            db_job.error_message = job.error_message
+        _upsert(
+            self.db,
+            BatchJobDB,
+            {
+                "id": job.id,
+                "document_ids": job.document_ids,
+                "status": job.status,
+                "created_at": job.created_at,
+                "completed_at": job.completed_at,
+                "error_message": job.error_message,
+            },
+            update_columns=("status", "completed_at", "error_message"),
+        )
         self.db.commit()
         return job
 
     def get_by_id(self, job_id: str) -> Optional[BatchJob]:
-        db_job = self.db.query(BatchJobDB).filter(BatchJobDB.id == job_id).first()
+        db_job = self.db.execute(_JOB_BY_ID, {"id": job_id}).one_or_none()
         if not db_job:
             return None
-        return BatchJob(
-            id=db_job.id, 
-            document_ids=db_job.document_ids, 
-            status=db_job.status,
-            created_at=db_job.created_at, 
-            completed_at=db_job.completed_at, 
-            error_message=db_job.error_message
-        )
\ No newline at end of file
+        return _to_batch_job(db_job)
+
+    # The worker drives a job through its lifecycle with guarded UPDATEs, so
+    # it never has to load the job first. Each guard makes the transition
+    # idempotent if Celery redelivers the task.
+
+    def mark_processing(self, job_id: str) -> Optional[List[str]]:
+        """Moves a PENDING job to PROCESSING and returns its document ids, or
+        None if there is no pending job with that id."""
+        document_ids = self.db.execute(
+            _MARK_JOB_PROCESSING, {"job_id": job_id}
+        ).scalar_one_or_none()
+        self.db.commit()
+        return document_ids
+
+    def mark_completed(self, job_id: str) -> None:
+        self._finish(job_id, status=JobStatus.COMPLETED)
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        self._finish(job_id, status=JobStatus.FAILED, error_message=error)
+
+    def _finish(self, job_id: str, **values: Any) -> None:
+        self.db.execute(_FINISH_JOB, {"job_id": job_id, "completed_at": now_utc(), **values})
+        self.db.commit()
\ No newline at end of file
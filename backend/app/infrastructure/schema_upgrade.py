@@ -0,0 +1,127 @@
+"""In-place upgrade of databases created by earlier versions of the models.
+
+Base.metadata.create_all only creates missing tables: it never alters an
+existing column, constraint or index. upgrade_schema() brings a database
+created before the current models up to date. Every step checks the
+current state first, so it is a no-op on an up-to-date database and safe to
+run on every start (main.py does so right after create_all).
+
+Run it by hand with ``python -m app.infrastructure.schema_upgrade``.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import AddConstraint
+
+from app.domain.models import DocumentState, DocumentType, JobStatus
+from app.infrastructure.models import BatchJobDB, DocumentDB
+
+logger = logging.getLogger(__name__)
+
+# Enum columns now stored as their lower-case values (string_enum) instead
+# of the member names SQLAlchemy's default Enum used, on PostgreSQL inside a
+# native ENUM type.
+_ENUM_COLUMNS = (
+    (DocumentDB.__table__.c.invoice_type, DocumentType),
+    (DocumentDB.__table__.c.status, DocumentState),
+    (BatchJobDB.__table__.c.status, JobStatus),
+)
+
+# Single-column indexes the search filters used before the composite
+# (column, created_at, id) indexes replaced them.
+_LEGACY_INDEXES = {
+    "documents": ("ix_documents_invoice_type", "ix_documents_status"),
+}
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _name_to_value_case(column_sql: str, enum_cls) -> str:
+    whens = " ".join(
+        f"WHEN {_quote(member.name)} THEN {_quote(member.value)}" for member in enum_cls
+    )
+    return f"CASE {column_sql} {whens} ELSE {column_sql} END"
+
+
+def _upgrade_enum_column(conn: Connection, column, enum_cls) -> None:
+    table, name = column.table.name, column.name
+
+    if conn.dialect.name == "postgresql":
+        data_type, udt_schema, udt_name = conn.execute(
+            text(
+                # create_all and the inspector calls below work on the default
+                # schema; another schema's documents table must not match too.
+                "SELECT data_type, udt_schema, udt_name FROM information_schema.columns "
+                "WHERE table_schema = current_schema() "
+                "AND table_name = :table AND column_name = :column"
+            ),
+            {"table": table, "column": name},
+        ).one()
+        if data_type == "USER-DEFINED":
+            # Native ENUM of member names -> VARCHAR of values, in one rewrite.
+            varchar = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {name} TYPE {varchar} "
+                f"USING ({_name_to_value_case(f'{name}::text', enum_cls)})"
+            ))
+            conn.execute(text(f"DROP TYPE IF EXISTS {udt_schema}.{udt_name}"))
+            logger.info("Converted %s.%s from ENUM %s to %s", table, name, udt_name, varchar)
+
+    # Non-native columns (e.g. SQLite) already are strings but may hold names.
+    names = ", ".join(_quote(member.name) for member in enum_cls)
+    result = conn.execute(text(
+        f"UPDATE {table} SET {name} = {_name_to_value_case(name, enum_cls)} "
+        f"WHERE {name} IN ({names})"
+    ))
+    if result.rowcount:
+        logger.info("Rewrote %d %s.%s values from names to values", result.rowcount, table, name)
+
+    # SQLite cannot add a constraint to an existing table; there the values
+    # are still validated on write by the Enum type.
+    if conn.dialect.name == "postgresql":
+        constraint_name = column.type.name
+        existing = {ck["name"] for ck in inspect(conn).get_check_constraints(table)}
+        if constraint_name not in existing:
+            constraint = next(ck for ck in column.table.constraints if ck.name == constraint_name)
+            conn.execute(AddConstraint(constraint))
+            logger.info("Added CHECK constraint %s", constraint_name)
+
+
+def _upgrade_indexes(conn: Connection, table) -> None:
+    """Creates missing model indexes and rebuilds those whose columns changed.
+
+    Plain CREATE INDEX blocks writes to the table while it builds (CONCURRENTLY
+    cannot run inside a transaction); on a large table run this module by hand
+    in a maintenance window before deploying.
+    """
+    for name in _LEGACY_INDEXES.get(table.name, ()):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    existing = {ix["name"]: ix["column_names"] for ix in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        columns = [column.name for column in index.columns]
+        if existing.get(index.name) == columns:
+            continue
+        if index.name in existing:
+            index.drop(conn)
+        index.create(conn)
+        logger.info("Built index %s on %s(%s)", index.name, table.name, ", ".join(columns))
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Applies every pending upgrade step in a single transaction."""
+    with engine.begin() as conn:
+        for column, enum_cls in _ENUM_COLUMNS:
+            _upgrade_enum_column(conn, column, enum_cls)
+        for table in (DocumentDB.__table__, BatchJobDB.__table__):
+            _upgrade_indexes(conn, table)
+
+
+if __name__ == "__main__":
+    import app.infrastructure.database as db_module
+
+    logging.basicConfig(level=logging.INFO)
+    upgrade_schema(db_module.engine)
@@ -4,40 +4,30 @@ from app.infrastructure.celery_config import celery_app
 from app.infrastructure.database import SessionLocal
 from app.infrastructure.repository import DocumentRepository, JobRepository
 
-@celery_app.task(name="process_documents_task")
+# Job progress lives in the database, so the Celery result is never read;
+# ignore_result skips the extra result-backend write per task.
+@celery_app.task(name="process_documents_task", ignore_result=True)
 def process_documents_task(job_id: str):
     db = SessionLocal()
     job_repo = JobRepository(db)
     doc_repo = DocumentRepository(db)
 
     try:
-        job = job_repo.get_by_id(job_id)
-        if not job:
+        document_ids = job_repo.mark_processing(job_id)
+        if document_ids is None:
             return
-            
-        job.start_processing()
-        job_repo.save(job)
 
         sleep_time = random.uniform(5, 10)
         time.sleep(sleep_time) # its only for requirements in challenge
 
         # TODO (so that we can see approved and rejected items in the test).
-        for doc_id in job.document_ids:
-            doc = doc_repo.get_by_id(doc_id)
-            if doc:
-                # We simulate business logic: 80% are approved, 20% are rejected.
-                if random.random() > 0.2:
-                    doc.approve()  # PENDING -> APPROVED
-                else:
-                    doc.reject()   # PENDING -> REJECTED
-                doc_repo.save(doc)
+        # We simulate business logic: 80% are approved, 20% are rejected.
+        doc_repo.resolve_pending(document_ids, approval_rate=0.8)
 
-        job.mark_as_completed()
-        job_repo.save(job)
+        job_repo.mark_completed(job_id)
 
     except Exception as e:
-        if 'job' in locals() and job:
-            job.mark_as_failed(str(e))
-            job_repo.save(job)
+        db.rollback()
+        job_repo.mark_failed(job_id, str(e))
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,11 +1,15 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import app.infrastructure.database as db_module
 from app.infrastructure.database import Base
 from app.api.routers import router
+from app.api.auth import API_KEY_NAME, PUBLIC_PATHS, APIGuardMiddleware
 from app.infrastructure.models import DocumentDB
+from app.infrastructure.schema_upgrade import upgrade_schema
 
 Base.metadata.create_all(bind=db_module.engine)
+upgrade_schema(db_module.engine)
 
 openapi_tags = [
     {
@@ -43,6 +47,7 @@ app = FastAPI(
     ),
     version="1.0.0",
     openapi_tags=openapi_tags,
+    default_response_class=ORJSONResponse,
     contact={
         "name": "Duppla Engineering",
         "email": "engineering@duppla.com",
@@ -52,6 +57,10 @@ app = FastAPI(
     },
 )
 
+# Added before CORS so CORSMiddleware stays outermost: preflight requests are
+# answered without a key and 401/429 responses still carry CORS headers.
+app.add_middleware(APIGuardMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -66,6 +75,26 @@ app.add_middleware(
 
 app.include_router(router)
 
+_default_openapi = app.openapi
+
+
+def openapi_with_api_key():
+    """Documents the X-API-Key scheme, which no longer comes from a route dependency."""
+    if not app.openapi_schema:
+        schema = _default_openapi()
+        schema.setdefault("components", {})["securitySchemes"] = {
+            "APIKeyHeader": {"type": "apiKey", "in": "header", "name": API_KEY_NAME},
+        }
+        for path, operations in schema["paths"].items():
+            if path in PUBLIC_PATHS:
+                continue
+            for operation in operations.values():
+                operation["security"] = [{"APIKeyHeader": []}]
+    return app.openapi_schema
+
+
+app.openapi = openapi_with_api_key
+
 
 @app.get("/", tags=["Health"], summary="Health check", include_in_schema=True)
 def health_check():
@@ -7,6 +7,10 @@ CLAVE: usamos StaticPool para que TODAS las conexiones SQLAlchemy
 compartan la misma base de datos en memoria. Sin esto, create_all
 crea las tablas en la conexión A pero el test usa la conexión B
 (vacía) → "no such table".
+
+Las tablas se crean una sola vez por sesión; cada test corre dentro de una
+transacción que se revierte al terminar, así que los commits de los
+repositorios (SAVEPOINTs) nunca llegan a la base compartida.
 """
 import os
 # Must be set BEFORE any app module is imported so database.py picks up
@@ -14,12 +18,20 @@ import os
 os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
 
 import pytest
-from unittest.mock import MagicMock, patch
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from types import MappingProxyType
+from unittest.mock import AsyncMock
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, configure_mappers, sessionmaker
 from sqlalchemy.pool import StaticPool
-from app.infrastructure.database import Base, get_db
+from app.infrastructure.database import Base, JSON_ENGINE_OPTIONS, get_db
+from app.application.use_cases import DocumentUseCase, clear_read_caches
+from app.domain.models import DocumentType
+from app.infrastructure.repository import DocumentRepository
+from app.infrastructure.tasks import process_documents_task
 from app.main import app
+from app.api import auth
+from app.api.auth import API_KEY_NAME, API_KEY_SECRET
+from app.api.schemas import DocumentResponse
 from fastapi.testclient import TestClient
 import app.infrastructure.database as db_module
 
@@ -29,7 +41,23 @@ test_engine = create_engine(
     SQLALCHEMY_TEST_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
+    **JSON_ENGINE_OPTIONS,
 )
+
+
+# pysqlite opens transactions lazily and never around DDL, which breaks
+# SAVEPOINTs. Let SQLAlchemy emit BEGIN itself (recipe from the SQLAlchemy
+# SQLite dialect docs) so the per-test rollback also undoes index DDL.
+@event.listens_for(test_engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(test_engine, "begin")
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
 db_module.engine = test_engine
@@ -39,56 +67,99 @@ db_module.SessionLocal = TestingSessionLocal
 # Fixtures
 # ---------------------------------------------------------------
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def setup_database():
-    """Crea tablas antes de cada test y las destruye al terminar."""
+    """Crea las tablas una vez para toda la sesión y las destruye al final.
+
+    Mapper configuration runs here too, so its one-off cost is not billed
+    to whichever test happens to run first.
+    """
+    configure_mappers()
     Base.metadata.create_all(bind=test_engine)
     yield
     Base.metadata.drop_all(bind=test_engine)
 
 
 @pytest.fixture(autouse=True)
-def mock_redis():
+def reset_read_caches():
+    """Empties the in-process read caches so no entry leaks between tests."""
+    clear_read_caches()
+    yield
+    clear_read_caches()
+
+
+@pytest.fixture(autouse=True)
+def mock_redis(monkeypatch):
     """Patches the Redis client for ALL tests so no live Redis is needed.
 
-    The mock simulates the INCR counter behaviour so rate-limit tests
+    The mock simulates the rate-limit script's counter so rate-limit tests
     can exercise the 429 path by controlling the return value directly.
     """
-    mock = MagicMock()
-    mock.incr.return_value = 1   # default: first request in the window
-    mock.expire.return_value = True
-    with patch("app.api.auth.redis_client", mock):
-        yield mock
+    mock = AsyncMock()
+    mock.evalsha.return_value = 1   # default: first request in the window
+    monkeypatch.setattr(auth, "redis_client", mock)
+    return mock
 
 
 @pytest.fixture
-def db_session(setup_database):
-    """Sesión directa a SQLite para tests de use_cases/repositorios."""
-    db = TestingSessionLocal()
+def db_session():
+    """Sesión dentro de una transacción que se revierte al terminar el test.
+
+    join_transaction_mode="create_savepoint" turns each repository commit
+    into a SAVEPOINT release, so the outer rollback discards everything.
+    """
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
     try:
         yield db
     finally:
         db.close()
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture
-def client(setup_database):
-    """TestClient con override de get_db apuntando a SQLite.
+def query_counter():
+    """Records every SQL statement sent to the test engine.
+
+    The repositories read through Core selects (no ORM relationships), so
+    N+1 regressions show up as extra statements here rather than lazy loads.
+    SAVEPOINT bookkeeping from the per-test transaction is left out.
+    """
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")):
+            statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(test_engine, "before_cursor_execute", _record)
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    """A single TestClient (and app lifespan) shared by the whole session.
 
     base_url is set so that Starlette populates request.client with a
-    loopback address — without it request.client is None and the
-    rate_limiter crashes with AttributeError: 'NoneType'.host.
+    loopback address — without it the scope has no client and the
+    rate limiter falls back to a shared key.
+
+    Because the app outlives each test, per-test state must be reset by the
+    fixtures that set it: client clears dependency_overrides, and
+    reset_read_caches empties the in-process caches. Cookies are never set
+    by this API, so the shared client carries nothing between tests.
     """
-    def override_get_db():
-        db = TestingSessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-
-    app.dependency_overrides[get_db] = override_get_db
     with TestClient(app, base_url="http://testclient") as c:
         yield c
+
+
+@pytest.fixture
+def client(app_client, db_session):
+    """TestClient cuyas requests usan la sesión transaccional del test."""
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield app_client
     app.dependency_overrides.clear()
 
 
@@ -96,15 +167,106 @@ def client(setup_database):
 # Shared fixtures
 # ---------------------------------------------------------------
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def headers():
-    return {"X-API-Key": "api-key-secret"}
+    """Read-only: shared by every test in the session."""
+    return MappingProxyType({API_KEY_NAME: API_KEY_SECRET})
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def valid_doc_payload():
     return {
         "invoice_type": "invoice",
         "amount": 1500.50,
         "metadata": {"client": "Test Client"},
     }
+
+
+class _DelayRecorder:
+    """Stand-in for a Celery task's .delay that only records its arguments.
+
+    A plain callable instead of a MagicMock: no child mocks or call-list
+    bookkeeping on every dispatch. Offers the assertions the tests use.
+    """
+    __slots__ = ("calls",)
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, *args):
+        self.calls.append(args)
+
+    def assert_called_once(self):
+        assert len(self.calls) == 1, f"expected one call, got {self.calls}"
+
+    def assert_called_once_with(self, *args):
+        assert self.calls == [args], f"expected one call with {args}, got {self.calls}"
+
+    def assert_not_called(self):
+        assert not self.calls, f"expected no calls, got {self.calls}"
+
+
+@pytest.fixture(autouse=True)
+def celery_task_mock(monkeypatch):
+    """Stubs process_documents_task.delay for ALL tests so no broker is needed.
+
+    Request the fixture by name to assert on the dispatched calls.
+    """
+    recorder = _DelayRecorder()
+    monkeypatch.setattr(process_documents_task, "delay", recorder)
+    return recorder
+
+
+@pytest.fixture
+def doc_repo(db_session):
+    """Repository on the test's session, for asserting on persisted state
+    without going through the HTTP layer."""
+    return DocumentRepository(db_session)
+
+
+@pytest.fixture
+def create_doc(doc_repo):
+    """Factory: stores a DRAFT document directly through the use case and
+    returns it shaped like the POST /documents response body.
+
+    Setup skips the HTTP round trip; tests of the create endpoint itself
+    still POST.
+    """
+    use_case = DocumentUseCase(doc_repo)
+
+    def _create(invoice_type="invoice", amount=100.0):
+        doc = use_case.create_document(invoice_type=DocumentType(invoice_type), amount=amount)
+        return DocumentResponse.model_validate(doc, from_attributes=True).model_dump(
+            mode="json", by_alias=True
+        )
+    return _create
+
+
+@pytest.fixture
+def bulk_create_docs(doc_repo):
+    """Factory: inserts ``n`` documents in one transaction, bypassing HTTP.
+
+    Amounts default to 100, 200, ... so ordering and range filters have
+    distinct values to work with.
+    """
+    def _create(n, amount_fn=lambda i: (i + 1) * 100.0, invoice_type=DocumentType.INVOICE):
+        return DocumentUseCase(doc_repo).create_documents(
+            [{"invoice_type": invoice_type, "amount": amount_fn(i)} for i in range(n)]
+        )
+    return _create
+
+
+@pytest.fixture
+def draft_doc(create_doc):
+    """A single document in DRAFT state."""
+    return create_doc()
+
+
+@pytest.fixture
+def job_id(client, headers, draft_doc):
+    """ID of a batch job submitted for ``draft_doc``."""
+    return client.post(
+        "/documents/batch/process",
+        json={"document_ids": [draft_doc["id"]]},
+        headers=headers,
+    ).json()["job_id"]
@@ -36,12 +36,27 @@ class TestDocumentCreation:
         assert doc.id is not None
         assert len(doc.id) == 36
 
+    def test_id_is_a_valid_uuid4(self):
+        """The generated ID parses as a version-4 UUID in canonical form."""
+        import uuid
+
+        doc = Document(invoice_type=DocumentType.INVOICE, amount=100)
+        parsed = uuid.UUID(doc.id)
+        assert parsed.version == 4
+        assert str(parsed) == doc.id
+
     def test_two_documents_have_different_ids(self):
         """Each document instance receives a unique identifier."""
         doc1 = Document(invoice_type=DocumentType.INVOICE, amount=100)
         doc2 = Document(invoice_type=DocumentType.INVOICE, amount=200)
         assert doc1.id != doc2.id
 
+    def test_created_at_strictly_increases(self):
+        """Documents created back to back never share a created_at, even within one microsecond."""
+        docs = [Document(invoice_type=DocumentType.INVOICE, amount=1) for _ in range(1000)]
+        stamps = [doc.created_at for doc in docs]
+        assert all(earlier < later for earlier, later in zip(stamps, stamps[1:]))
+
     def test_amount_must_be_greater_than_zero(self):
         """An amount of exactly zero is rejected by field validation."""
         with pytest.raises(ValidationError):
@@ -57,11 +72,11 @@ class TestDocumentCreation:
         doc = Document(invoice_type=DocumentType.INVOICE, amount=100)
         assert doc.metadata_doc == {}
 
-    def test_all_document_types_are_valid(self):
+    @pytest.mark.parametrize("doc_type", list(DocumentType), ids=lambda t: t.value)
+    def test_document_type_is_valid(self, doc_type):
         """Every member of DocumentType can be used to create a document."""
-        for doc_type in DocumentType:
-            doc = Document(invoice_type=doc_type, amount=1)
-            assert doc.invoice_type == doc_type
+        doc = Document(invoice_type=doc_type, amount=1)
+        assert doc.invoice_type == doc_type
 
 
 # ================================================================
@@ -79,26 +94,16 @@ class TestDocumentStateTransitions:
         doc.submit_for_review()
         assert doc.status == DocumentState.PENDING
 
-    def test_submit_for_review_from_pending_raises(self):
-        """Calling submit_for_review on a PENDING document is invalid."""
-        doc = Document(invoice_type=DocumentType.INVOICE, amount=100)
-        doc.submit_for_review()
-        with pytest.raises(InvalidStateTransitionError):
-            doc.submit_for_review()
-
-    def test_submit_for_review_from_approved_raises(self):
-        """Calling submit_for_review on an APPROVED document is invalid."""
-        doc = Document(invoice_type=DocumentType.INVOICE, amount=100)
-        doc.submit_for_review()
-        doc.approve()
-        with pytest.raises(InvalidStateTransitionError):
-            doc.submit_for_review()
-
-    def test_submit_for_review_from_rejected_raises(self):
-        """Calling submit_for_review on a REJECTED document is invalid."""
+    @pytest.mark.parametrize(
+        "transitions",
+        [("submit_for_review",), ("submit_for_review", "approve"), ("submit_for_review", "reject")],
+        ids=["from_pending", "from_approved", "from_rejected"],
+    )
+    def test_submit_for_review_outside_draft_raises(self, transitions):
+        """Calling submit_for_review on a PENDING, APPROVED or REJECTED document is invalid."""
         doc = Document(invoice_type=DocumentType.INVOICE, amount=100)
-        doc.submit_for_review()
-        doc.reject()
+        for transition in transitions:
+            getattr(doc, transition)()
         with pytest.raises(InvalidStateTransitionError):
             doc.submit_for_review()
 
@@ -157,21 +162,23 @@ class TestDocumentStateTransitions:
 class TestBatchJob:
     """Tests for BatchJob status transitions and field defaults."""
 
-    def test_default_status_is_pending(self):
-        """A newly created batch job starts in PENDING status."""
-        job = BatchJob(document_ids=["id-1", "id-2"])
+    def test_new_job_defaults(self):
+        """A new batch job is PENDING, has no completion timestamp and stores every document ID."""
+        ids = ["abc", "def", "ghi"]
+        job = BatchJob(document_ids=ids)
         assert job.status == JobStatus.PENDING
+        assert job.completed_at is None
+        assert job.document_ids == ids
 
-    def test_start_processing(self):
-        """start_processing transitions the job to PROCESSING status."""
+    def test_lifecycle_to_completed(self):
+        """start_processing moves the job to PROCESSING; mark_as_completed then
+        sets COMPLETED and records completed_at."""
         job = BatchJob(document_ids=["id-1"])
+
         job.start_processing()
         assert job.status == JobStatus.PROCESSING
+        assert job.completed_at is None
 
-    def test_mark_as_completed(self):
-        """mark_as_completed sets status to COMPLETED and records completed_at."""
-        job = BatchJob(document_ids=["id-1"])
-        job.start_processing()
         job.mark_as_completed()
         assert job.status == JobStatus.COMPLETED
         assert job.completed_at is not None
@@ -184,14 +191,3 @@ class TestBatchJob:
         assert job.status == JobStatus.FAILED
         assert job.error_message == "Timeout error"
         assert job.completed_at is not None
-
-    def test_completed_at_is_none_by_default(self):
-        """A new batch job has no completion timestamp."""
-        job = BatchJob(document_ids=["id-1"])
-        assert job.completed_at is None
-
-    def test_document_ids_are_stored(self):
-        """All submitted document IDs are stored on the batch job."""
-        ids = ["abc", "def", "ghi"]
-        job = BatchJob(document_ids=ids)
-        assert job.document_ids == ids
@@ -0,0 +1,111 @@
+"""
+test_schema_upgrade.py — Upgrade of databases created by earlier model versions.
+
+Each test builds the legacy tables by hand on its own in-memory SQLite engine,
+so the shared session-scoped schema from conftest.py is never touched.
+"""
+import pytest
+from unittest.mock import patch
+from sqlalchemy import Index, create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.domain.models import DocumentState, DocumentType, JobStatus
+from app.infrastructure.database import JSON_ENGINE_OPTIONS
+from app.infrastructure.models import BatchJobDB, DocumentDB
+from app.infrastructure.schema_upgrade import upgrade_schema
+
+# Tables as the original models created them: enum columns held member names.
+LEGACY_DDL = (
+    """CREATE TABLE documents (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        invoice_type VARCHAR(16) NOT NULL,
+        amount FLOAT NOT NULL,
+        status VARCHAR(8) NOT NULL,
+        created_at DATETIME,
+        metadata_doc JSON
+    )""",
+    """CREATE TABLE batch_jobs (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        document_ids JSON NOT NULL,
+        status VARCHAR(10) NOT NULL,
+        created_at DATETIME,
+        completed_at DATETIME,
+        error_message VARCHAR
+    )""",
+    "CREATE INDEX ix_documents_id ON documents (id)",
+    "CREATE INDEX ix_documents_invoice_type ON documents (invoice_type)",
+    "CREATE INDEX ix_documents_status ON documents (status)",
+    # Same name as a current index, but without the id tiebreaker column.
+    "CREATE INDEX ix_documents_created_at ON documents (created_at DESC)",
+    "CREATE INDEX ix_batch_jobs_id ON batch_jobs (id)",
+    "CREATE INDEX ix_batch_jobs_status ON batch_jobs (status)",
+)
+
+
+def _index_columns(engine, table):
+    return {ix["name"]: ix["column_names"] for ix in inspect(engine).get_indexes(table)}
+
+
+@pytest.fixture
+def legacy_engine():
+    """An in-memory SQLite database with the legacy schema and a few rows."""
+    engine = create_engine("sqlite://", **JSON_ENGINE_OPTIONS)
+    with engine.begin() as conn:
+        for ddl in LEGACY_DDL:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO documents (id, invoice_type, amount, status, metadata_doc) VALUES "
+            "('d1', 'PROOF_OF_PAYMENT', 10.0, 'DRAFT', '{}'), "
+            "('d2', 'INVOICE', 20.0, 'APPROVED', '{}')"
+        ))
+        conn.execute(text(
+            "INSERT INTO batch_jobs (id, document_ids, status) VALUES ('j1', '[\"d1\"]', 'COMPLETED')"
+        ))
+    yield engine
+    engine.dispose()
+
+
+class TestEnumColumns:
+    """Enum columns holding member names are rewritten to the stored values."""
+
+    def test_legacy_rows_load_as_enums_after_upgrade(self, legacy_engine):
+        upgrade_schema(legacy_engine)
+
+        with Session(legacy_engine) as session:
+            d1, d2 = session.query(DocumentDB).order_by(DocumentDB.id).all()
+            job = session.get(BatchJobDB, "j1")
+
+        assert (d1.invoice_type, d1.status) == (DocumentType.PROOF_OF_PAYMENT, DocumentState.DRAFT)
+        assert (d2.invoice_type, d2.status) == (DocumentType.INVOICE, DocumentState.APPROVED)
+        assert job.status == JobStatus.COMPLETED
+
+    def test_upgrade_is_idempotent(self, legacy_engine):
+        upgrade_schema(legacy_engine)
+        with legacy_engine.connect() as conn:
+            before = conn.execute(text("SELECT id, invoice_type, status FROM documents ORDER BY id")).all()
+
+        upgrade_schema(legacy_engine)
+        with legacy_engine.connect() as conn:
+            after = conn.execute(text("SELECT id, invoice_type, status FROM documents ORDER BY id")).all()
+
+        assert before == after == [("d1", "proof of payment", "draft"), ("d2", "invoice", "approved")]
+
+
+class TestIndexes:
+    """Index set is brought in line with the model definitions."""
+
+    def test_upgrade_builds_model_indexes_and_drops_legacy_ones(self, legacy_engine):
+        upgrade_schema(legacy_engine)
+
+        for table in (DocumentDB.__table__, BatchJobDB.__table__):
+            expected = {ix.name: [c.name for c in ix.columns] for ix in table.indexes}
+            assert _index_columns(legacy_engine, table.name) == expected
+
+    def test_second_upgrade_leaves_indexes_alone(self, legacy_engine):
+        upgrade_schema(legacy_engine)
+
+        with patch.object(Index, "create") as create, patch.object(Index, "drop") as drop:
+            upgrade_schema(legacy_engine)
+
+        create.assert_not_called()
+        drop.assert_not_called()
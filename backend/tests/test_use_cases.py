@@ -2,16 +2,14 @@
 test_use_cases.py — Application layer tests (use cases).
 
 Uses real repositories backed by an in-memory SQLite database (via conftest.py fixtures).
-Celery tasks are mocked with 'with patch(...)' to avoid requiring a live broker.
+Celery's .delay is stubbed for every test by conftest.py, so no live broker is needed.
 """
 import pytest
 from unittest.mock import patch
 
 from app.application.use_cases import DocumentUseCase, BatchJobUseCase
 from app.infrastructure.repository import DocumentRepository, JobRepository
-from app.domain.models import DocumentType, DocumentState
-
-CELERY_TASK_PATH = "app.infrastructure.tasks.process_documents_task.delay"
+from app.domain.models import DocumentType, DocumentState, JobStatus
 
 
 # ================================================================
@@ -26,30 +24,64 @@ class TestDocumentUseCase:
         """Provides a DocumentUseCase instance backed by the test SQLite session."""
         return DocumentUseCase(DocumentRepository(db_session))
 
-    def test_create_document_returns_document_with_id(self, use_case):
-        """create_document returns a persisted Document with a generated ID and DRAFT status."""
-        doc = use_case.create_document(invoice_type=DocumentType.INVOICE, amount=500.0)
-        assert doc.id is not None
-        assert doc.status == DocumentState.DRAFT
-        assert doc.amount == 500.0
-
-    def test_create_document_with_metadata(self, use_case):
-        """Metadata passed to create_document is stored and returned unchanged."""
+    @pytest.mark.parametrize(
+        "invoice_type, amount, metadata_in, metadata_out",
+        [
+            (DocumentType.INVOICE, 500.0, None, {}),
+            (DocumentType.RECEIPT, 200.0, {"client": "Acme Corp"}, {"client": "Acme Corp"}),
+        ],
+        ids=["no_metadata_defaults_to_empty_dict", "metadata_returned_unchanged"],
+    )
+    def test_create_document(self, use_case, invoice_type, amount, metadata_in, metadata_out):
+        """create_document returns a persisted DRAFT Document with a generated ID;
+        metadata is stored unchanged and None becomes an empty dict."""
         doc = use_case.create_document(
-            invoice_type=DocumentType.RECEIPT,
-            amount=200.0,
-            metadata_doc={"client": "Acme Corp"},
+            invoice_type=invoice_type,
+            amount=amount,
+            metadata_doc=metadata_in,
         )
-        assert doc.metadata_doc == {"client": "Acme Corp"}
+        assert doc.id is not None
+        assert doc.status == DocumentState.DRAFT
+        assert doc.amount == amount
+        assert doc.metadata_doc == metadata_out
+
+    @pytest.mark.parametrize(
+        "write",
+        [
+            lambda uc, meta: uc.create_document(DocumentType.INVOICE, 100.0, meta),
+            lambda uc, meta: uc.create_documents([
+                {"invoice_type": DocumentType.INVOICE, "amount": 100.0, "metadata_doc": meta},
+            ]),
+            lambda uc, meta: uc.update_document(
+                uc.create_document(DocumentType.INVOICE, 100.0).id, metadata_doc=meta
+            ),
+        ],
+        ids=["create_document", "create_documents", "update_document"],
+    )
+    def test_metadata_orjson_cannot_encode_is_rejected(self, use_case, write):
+        """Metadata with an integer beyond 64 bits raises ValueError instead of
+        being stored and read back as a float."""
+        with pytest.raises(ValueError, match="not encodable"):
+            write(use_case, {"n": 10**30})
+
+    def test_metadata_at_64_bit_limit_round_trips_exactly(self, use_case):
+        """The largest integers orjson encodes are read back unchanged."""
+        metadata = {"max": 2**64 - 1, "min": -(2**63)}
+        doc = use_case.create_document(DocumentType.INVOICE, 100.0, metadata)
+
+        assert use_case.repo.get_by_id(doc.id).metadata_doc == metadata
+
+    def test_create_documents_persists_all_in_draft(self, use_case):
+        """create_documents stores every item as a DRAFT document."""
+        created = use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 10.0},
+            {"invoice_type": DocumentType.RECEIPT, "amount": 20.0, "metadata_doc": {"k": "v"}},
+        ])
 
-    def test_create_document_none_metadata_defaults_to_empty_dict(self, use_case):
-        """Passing None for metadata_doc results in an empty dict being stored."""
-        doc = use_case.create_document(
-            invoice_type=DocumentType.INVOICE,
-            amount=100.0,
-            metadata_doc=None,
-        )
-        assert doc.metadata_doc == {}
+        docs, total = use_case.search_documents(skip=0, limit=10)
+        assert total == 2
+        assert {doc.id for doc in docs} == {doc.id for doc in created}
+        assert all(doc.status == DocumentState.DRAFT for doc in docs)
 
     def test_get_document_returns_saved_document(self, use_case):
         """get_document retrieves the same document that was previously created."""
@@ -58,6 +90,25 @@ class TestDocumentUseCase:
         assert found is not None
         assert found.id == created.id
 
+    def test_get_document_is_served_from_cache(self, use_case):
+        """A second get_document within the TTL does not hit the repository."""
+        created = use_case.create_document(invoice_type=DocumentType.INVOICE, amount=100.0)
+        use_case.get_document(created.id)
+
+        with patch.object(DocumentRepository, "get_by_id") as mock_get:
+            found = use_case.get_document(created.id)
+            mock_get.assert_not_called()
+        assert found.id == created.id
+
+    def test_update_document_invalidates_cache(self, use_case):
+        """get_document sees the new values right after update_document."""
+        created = use_case.create_document(invoice_type=DocumentType.INVOICE, amount=100.0)
+        use_case.get_document(created.id)
+
+        use_case.update_document(created.id, amount=250.0)
+
+        assert use_case.get_document(created.id).amount == 250.0
+
     def test_get_document_returns_none_for_unknown_id(self, use_case):
         """get_document returns None when the provided ID does not exist."""
         result = use_case.get_document("non-existent-id")
@@ -65,17 +116,53 @@ class TestDocumentUseCase:
 
     def test_search_returns_all_documents(self, use_case):
         """search_documents with no filters returns all records and the correct total."""
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=100.0)
-        use_case.create_document(invoice_type=DocumentType.RECEIPT, amount=200.0)
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 100.0},
+            {"invoice_type": DocumentType.RECEIPT, "amount": 200.0},
+        ])
 
         docs, total = use_case.search_documents(skip=0, limit=10)
         assert total == 2
         assert len(docs) == 2
 
+    def test_search_fetches_page_and_total_in_one_query(self, use_case, query_counter):
+        """A search runs a single statement regardless of page size; a second
+        page with the same filters reuses the cached total."""
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": float(i + 1)} for i in range(5)
+        ])
+        query_counter.clear()
+
+        docs, total = use_case.search_documents(skip=0, limit=10)
+        assert len(query_counter) == 1
+        assert (len(docs), total) == (5, 5)
+
+        use_case.search_documents(skip=2, limit=2)
+        assert len(query_counter) == 2
+
+    def test_search_lists_rapid_inserts_newest_first(self, use_case):
+        """Documents created in quick succession list in exact reverse insertion order."""
+        created = [use_case.create_document(DocumentType.INVOICE, float(i + 1)) for i in range(50)]
+
+        docs, _ = use_case.search_documents(skip=0, limit=50)
+        assert [doc.id for doc in docs] == [doc.id for doc in reversed(created)]
+
+    def test_search_past_last_page_still_counts(self, use_case):
+        """An offset beyond every match returns no rows but the real total."""
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": float(i + 1)} for i in range(3)
+        ])
+
+        docs, total = use_case.search_documents(skip=10, limit=5)
+        assert docs == []
+        assert total == 3
+
     def test_search_filter_by_invoice_type(self, use_case):
         """Filtering by invoice_type returns only documents of that type."""
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=100.0)
-        use_case.create_document(invoice_type=DocumentType.RECEIPT, amount=200.0)
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 100.0},
+            {"invoice_type": DocumentType.RECEIPT, "amount": 200.0},
+        ])
 
         docs, total = use_case.search_documents(skip=0, limit=10, invoice_type=DocumentType.INVOICE)
         assert total == 1
@@ -83,16 +170,35 @@ class TestDocumentUseCase:
 
     def test_search_filter_by_status(self, use_case):
         """Filtering by status=DRAFT returns all newly created documents."""
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=100.0)
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=200.0)
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 100.0},
+            {"invoice_type": DocumentType.INVOICE, "amount": 200.0},
+        ])
 
         docs, total = use_case.search_documents(skip=0, limit=10, status=DocumentState.DRAFT)
         assert total == 2
 
+    def test_search_status_total_sees_worker_updates(self, use_case, doc_repo):
+        """A status change made outside this process's use cases (the Celery
+        worker) shows up in the next status-filtered total at once."""
+        docs = use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 100.0},
+            {"invoice_type": DocumentType.INVOICE, "amount": 200.0},
+        ])
+        doc_repo.mark_pending([doc.id for doc in docs])
+        assert use_case.search_documents(skip=0, limit=10, status=DocumentState.PENDING)[1] == 2
+
+        doc_repo.resolve_pending([doc.id for doc in docs], approval_rate=1.0)
+
+        assert use_case.search_documents(skip=0, limit=10, status=DocumentState.PENDING)[1] == 0
+        assert use_case.search_documents(skip=0, limit=10, status=DocumentState.APPROVED)[1] == 2
+
     def test_search_filter_by_min_amount(self, use_case):
         """Filtering by min_amount excludes documents with lower amounts."""
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=50.0)
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=500.0)
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 50.0},
+            {"invoice_type": DocumentType.INVOICE, "amount": 500.0},
+        ])
 
         docs, total = use_case.search_documents(skip=0, limit=10, min_amount=100.0)
         assert total == 1
@@ -100,30 +206,82 @@ class TestDocumentUseCase:
 
     def test_search_filter_by_max_amount(self, use_case):
         """Filtering by max_amount excludes documents with higher amounts."""
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=50.0)
-        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=500.0)
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 50.0},
+            {"invoice_type": DocumentType.INVOICE, "amount": 500.0},
+        ])
 
         docs, total = use_case.search_documents(skip=0, limit=10, max_amount=100.0)
         assert total == 1
         assert docs[0].amount == 50.0
 
-    def test_search_pagination_skip(self, use_case):
-        """The skip parameter offsets the result window; total count is unaffected."""
-        for i in range(5):
-            use_case.create_document(invoice_type=DocumentType.INVOICE, amount=float(i + 1) * 100)
-
-        docs, total = use_case.search_documents(skip=3, limit=10)
+    def test_search_combined_filters(self, use_case):
+        """Several filters together apply all of their predicates."""
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": 50.0},
+            {"invoice_type": DocumentType.INVOICE, "amount": 150.0},
+            {"invoice_type": DocumentType.RECEIPT, "amount": 150.0},
+            {"invoice_type": DocumentType.INVOICE, "amount": 500.0},
+        ])
+
+        docs, total = use_case.search_documents(
+            skip=0, limit=10, invoice_type=DocumentType.INVOICE, min_amount=100.0, max_amount=200.0
+        )
+        assert total == 1
+        assert docs[0].amount == 150.0
+
+    @pytest.mark.parametrize(
+        "skip, limit, expected_len",
+        [(3, 10, 2), (0, 2, 2)],
+        ids=["skip_offsets_window", "limit_caps_items"],
+    )
+    def test_search_pagination(self, use_case, skip, limit, expected_len):
+        """skip offsets and limit caps the result window; the total count is unaffected."""
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": float(i + 1) * 100} for i in range(5)
+        ])
+
+        docs, total = use_case.search_documents(skip=skip, limit=limit)
+        assert total == 5
+        assert len(docs) == expected_len
+
+    def test_search_keyset_pagination_continues_after_cursor(self, use_case):
+        """Seeking after the 3rd row returns the remaining rows, matching the
+        offset page at the same position."""
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": float(i + 1) * 100} for i in range(5)
+        ])
+        first_page, _ = use_case.search_documents(skip=0, limit=3)
+        third = first_page[-1]
+
+        docs, total = use_case.search_documents(skip=0, limit=10, after=(third.created_at, third.id))
+        offset_docs, _ = use_case.search_documents(skip=3, limit=10)
         assert total == 5
         assert len(docs) == 2
+        assert [doc.id for doc in docs] == [doc.id for doc in offset_docs]
 
-    def test_search_pagination_limit(self, use_case):
-        """The limit parameter caps the number of returned items; total count is unaffected."""
-        for i in range(5):
-            use_case.create_document(invoice_type=DocumentType.INVOICE, amount=float(i + 1) * 100)
+    def test_search_reuses_cached_total_across_pages(self, use_case):
+        """Paging through the same filters runs the COUNT query only once."""
+        use_case.create_documents([
+            {"invoice_type": DocumentType.INVOICE, "amount": float(i + 1)} for i in range(3)
+        ])
 
-        docs, total = use_case.search_documents(skip=0, limit=2)
-        assert total == 5
-        assert len(docs) == 2
+        use_case.search_documents(skip=0, limit=1)
+        with patch.object(DocumentRepository, "search", return_value=([], None)) as mock_search:
+            _, total = use_case.search_documents(skip=1, limit=1)
+
+        assert total == 3
+        assert mock_search.call_args.kwargs["with_total"] is False
+
+    def test_create_document_invalidates_cached_total(self, use_case):
+        """A new document is reflected in the total right after it is created."""
+        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=1.0)
+        use_case.search_documents(skip=0, limit=10)
+
+        use_case.create_document(invoice_type=DocumentType.INVOICE, amount=2.0)
+
+        _, total = use_case.search_documents(skip=0, limit=10)
+        assert total == 2
 
     def test_search_empty_db_returns_zero(self, use_case):
         """Searching an empty database returns an empty list and total=0."""
@@ -158,50 +316,156 @@ class TestBatchJobUseCase:
             invoice_type=DocumentType.INVOICE, amount=300.0
         )
 
-    def test_create_batch_process_returns_job(self, use_case, draft_document):
-        """create_batch_process returns a BatchJob with a generated ID."""
-        with patch(CELERY_TASK_PATH):
-            job = use_case.create_batch_process([draft_document.id])
+    def test_create_batch_process_side_effects(self, use_case, draft_document, repos, celery_task_mock):
+        """A single batch call returns a job with a generated ID, dispatches
+        exactly one Celery task for it and moves the document to PENDING."""
+        job = use_case.create_batch_process([draft_document.id])
+
         assert job is not None
         assert job.id is not None
+        celery_task_mock.assert_called_once_with(job.id)
+        _, doc_repo = repos
+        assert doc_repo.get_by_id(draft_document.id).status == DocumentState.PENDING
+
+    def test_create_batch_process_changes_all_docs_to_pending(self, use_case, draft_document, repos):
+        """Every document in a multi-document batch is moved to PENDING in one pass."""
+        _, doc_repo = repos
+        other = DocumentUseCase(doc_repo).create_document(
+            invoice_type=DocumentType.RECEIPT, amount=50.0
+        )
 
-    def test_create_batch_process_enqueues_celery_task(self, use_case, draft_document):
-        """create_batch_process dispatches exactly one Celery task with the job ID."""
-        with patch(CELERY_TASK_PATH) as mock_delay:
-            job = use_case.create_batch_process([draft_document.id])
-            mock_delay.assert_called_once_with(job.id)
+        use_case.create_batch_process([draft_document.id, other.id])
 
-    def test_create_batch_process_changes_doc_to_pending(self, use_case, draft_document, repos):
-        """Documents included in the batch transition to PENDING status."""
-        with patch(CELERY_TASK_PATH):
-            use_case.create_batch_process([draft_document.id])
+        docs = doc_repo.get_by_ids([draft_document.id, other.id])
+        assert len(docs) == 2
+        assert all(doc.status == DocumentState.PENDING for doc in docs)
 
+    def test_create_batch_process_moves_docs_with_one_update(self, use_case, draft_document, repos, query_counter):
+        """The status transition is one set-based UPDATE (id IN ...) whatever
+        the batch size, not one UPDATE per document."""
         _, doc_repo = repos
-        updated_doc = doc_repo.get_by_id(draft_document.id)
-        assert updated_doc.status == DocumentState.PENDING
+        others = DocumentUseCase(doc_repo).create_documents([
+            {"invoice_type": DocumentType.RECEIPT, "amount": float(i + 1)} for i in range(3)
+        ])
+        query_counter.clear()
+
+        use_case.create_batch_process([draft_document.id, *(doc.id for doc in others)])
+
+        updates = [sql for sql in query_counter if sql.lstrip().upper().startswith("UPDATE DOCUMENTS")]
+        assert len(updates) == 1
+        assert " IN " in updates[0].upper()
+
+    def test_create_batch_process_leaves_docs_untouched_if_one_is_missing(self, use_case, draft_document, repos):
+        """A batch with an unknown ID fails before any document changes status."""
+        with pytest.raises(ValueError, match="not found"):
+            use_case.create_batch_process([draft_document.id, "id-does-not-exist"])
 
-    def test_create_batch_process_raises_for_unknown_document(self, use_case):
-        """Submitting an unknown document ID raises ValueError with 'not found'."""
+        _, doc_repo = repos
+        assert doc_repo.get_by_id(draft_document.id).status == DocumentState.DRAFT
+
+    def test_create_batch_process_lost_race_raises_without_job(
+        self, use_case, draft_document, repos, celery_task_mock
+    ):
+        """If a concurrent batch claims a document after it was read, nothing
+        is moved, no job is saved and no task is dispatched."""
+        _, doc_repo = repos
+        other = DocumentUseCase(doc_repo).create_document(
+            invoice_type=DocumentType.RECEIPT, amount=50.0
+        )
+        read_documents = DocumentRepository.get_by_ids
+
+        def read_then_lose_race(repo, doc_ids):
+            docs = read_documents(repo, doc_ids)
+            repo.mark_pending([other.id])  # the concurrent batch
+            return docs
+
+        # The repositories use __slots__, so patch the classes, not instances.
+        with patch.object(DocumentRepository, "get_by_ids", autospec=True, side_effect=read_then_lose_race), \
+                patch.object(JobRepository, "save") as save_job:
+            with pytest.raises(ValueError, match="no longer in draft"):
+                use_case.create_batch_process([draft_document.id, other.id])
+
+        save_job.assert_not_called()
+        celery_task_mock.assert_not_called()
+        assert doc_repo.get_by_id(draft_document.id).status == DocumentState.DRAFT
+        assert doc_repo.get_by_id(other.id).status == DocumentState.PENDING
+
+    def test_create_batch_process_unknown_document_raises_without_enqueue(self, use_case, celery_task_mock):
+        """An unknown document ID raises ValueError with 'not found' and no
+        Celery task is dispatched."""
         with pytest.raises(ValueError, match="not found"):
-            with patch(CELERY_TASK_PATH):
-                use_case.create_batch_process(["id-does-not-exist"])
+            use_case.create_batch_process(["id-does-not-exist"])
+        celery_task_mock.assert_not_called()
 
-    def test_create_batch_does_not_enqueue_if_doc_not_found(self, use_case):
-        """No Celery task is dispatched when a document ID is not found."""
-        with patch(CELERY_TASK_PATH) as mock_delay:
-            with pytest.raises(ValueError):
-                use_case.create_batch_process(["bad-id"])
-            mock_delay.assert_not_called()
+    def test_resolve_pending_only_resolves_pending_documents(self, use_case, draft_document, repos):
+        """resolve_pending moves PENDING documents and leaves DRAFT ones untouched."""
+        _, doc_repo = repos
+        untouched = DocumentUseCase(doc_repo).create_document(
+            invoice_type=DocumentType.INVOICE, amount=75.0
+        )
+        use_case.create_batch_process([draft_document.id])
+
+        doc_repo.resolve_pending([draft_document.id, untouched.id], approval_rate=1.0)
+
+        assert doc_repo.get_by_id(draft_document.id).status == DocumentState.APPROVED
+        assert doc_repo.get_by_id(untouched.id).status == DocumentState.DRAFT
+
+    def test_resolve_pending_rejects_with_zero_approval_rate(self, use_case, draft_document, repos):
+        """With approval_rate=0 every PENDING document is rejected."""
+        _, doc_repo = repos
+        other = DocumentUseCase(doc_repo).create_document(
+            invoice_type=DocumentType.RECEIPT, amount=50.0
+        )
+        use_case.create_batch_process([draft_document.id, other.id])
+
+        doc_repo.resolve_pending([draft_document.id, other.id], approval_rate=0.0)
+
+        assert doc_repo.get_by_id(draft_document.id).status == DocumentState.REJECTED
+        assert doc_repo.get_by_id(other.id).status == DocumentState.REJECTED
+
+    def test_job_lifecycle_transitions_are_guarded(self, use_case, draft_document, repos):
+        """mark_processing claims a PENDING job once; mark_completed closes it."""
+        job_repo, _ = repos
+        job = use_case.create_batch_process([draft_document.id])
+
+        assert job_repo.mark_processing(job.id) == [draft_document.id]
+        assert job_repo.mark_processing(job.id) is None
+
+        job_repo.mark_completed(job.id)
+
+        stored = job_repo.get_by_id(job.id)
+        assert stored.status == JobStatus.COMPLETED
+        assert stored.completed_at is not None
+
+    def test_mark_failed_records_error(self, use_case, draft_document, repos):
+        """mark_failed closes a PROCESSING job as FAILED with its error message."""
+        job_repo, _ = repos
+        job = use_case.create_batch_process([draft_document.id])
+        job_repo.mark_processing(job.id)
+
+        job_repo.mark_failed(job.id, "worker crashed")
+
+        stored = job_repo.get_by_id(job.id)
+        assert stored.status == JobStatus.FAILED
+        assert stored.error_message == "worker crashed"
+        assert stored.completed_at is not None
 
     def test_get_job_status_returns_existing_job(self, use_case, draft_document):
         """get_job_status retrieves the same job that was previously created."""
-        with patch(CELERY_TASK_PATH):
-            job = use_case.create_batch_process([draft_document.id])
+        job = use_case.create_batch_process([draft_document.id])
 
         found = use_case.get_job_status(job.id)
         assert found is not None
         assert found.id == job.id
 
+    def test_get_job_status_caches_misses(self, use_case):
+        """A repeated lookup of an unknown job ID is answered without querying again."""
+        use_case.get_job_status("non-existent-job-id")
+
+        with patch.object(JobRepository, "get_by_id") as mock_get:
+            assert use_case.get_job_status("non-existent-job-id") is None
+            mock_get.assert_not_called()
+
     def test_get_job_status_returns_none_for_unknown_id(self, use_case):
         """get_job_status returns None when the provided job ID does not exist."""
         result = use_case.get_job_status("non-existent-job-id")